@@ -23,6 +23,7 @@ from ._src.collision_driver import collision as collision
 from ._src.collision_driver import nxn_broadphase as nxn_broadphase
 from ._src.constraint import make_constraint as make_constraint
 from ._src.forward import euler as euler
+from ._src.forward import euler_graph as euler_graph
 from ._src.forward import forward as forward
 from ._src.forward import fwd_acceleration as fwd_acceleration
 from ._src.forward import fwd_actuation as fwd_actuation
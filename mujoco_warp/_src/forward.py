@@ -25,7 +25,6 @@ from . import passive
 from . import smooth
 from . import solver
 from .support import xfrc_accumulate
-from .types import MJ_MINVAL
 from .types import BiasType
 from .types import Data
 from .types import DisableBit
@@ -53,47 +52,32 @@ def _advance(
     d: Data,
     act_dot_in: array2df,
   ):
-    worldId, actid = wp.tid()
+    worldId, stateid = wp.tid()
+    actid = m.actuator_stateful_idx[stateid]
 
     # get the high/low range for each actuator state
     limited = m.actuator_actlimited[actid]
     range_low = wp.where(limited, m.actuator_actrange[actid][0], -wp.inf)
     range_high = wp.where(limited, m.actuator_actrange[actid][1], wp.inf)
 
-    # get the actual actuation - skip if -1 (means stateless actuator)
     act_adr = m.actuator_actadr[actid]
-    if act_adr == -1:
-      return
-
     acts = d.act[worldId]
-    acts_dot = act_dot_in[worldId]
-
     act = acts[act_adr]
-    act_dot = acts_dot[act_adr]
+    act_dot = act_dot_in[worldId, act_adr]
 
-    # check dynType
-    dyn_type = m.actuator_dyntype[actid]
-    dyn_prm = m.actuator_dynprm[actid][0]
-
-    # advance the actuation
-    if dyn_type == wp.static(DynType.FILTEREXACT.value):
-      tau = wp.where(dyn_prm < MJ_MINVAL, MJ_MINVAL, dyn_prm)
-      act = act + act_dot * tau * (1.0 - wp.exp(-m.opt.timestep / tau))
-    else:
-      act = act + act_dot * m.opt.timestep
+    # advance the actuation, selecting between both updates to avoid divergence
+    dt = m.opt.timestep
+    tau = m.actuator_filter_tau[actid]
+    filterexact = m.actuator_dyntype[actid] == wp.static(DynType.FILTEREXACT.value)
+    act = act + act_dot * wp.where(filterexact, tau * (1.0 - wp.exp(-dt / tau)), dt)
 
     # apply limits
-    wp.clamp(act, range_low, range_high)
+    act = wp.clamp(act, range_low, range_high)
 
     acts[act_adr] = act
 
   @kernel
-  def advance_velocities(m: Model, d: Data, qacc: array2df):
-    worldId, tid = wp.tid()
-    d.qvel[worldId, tid] = d.qvel[worldId, tid] + qacc[worldId, tid] * m.opt.timestep
-
-  @kernel
-  def integrate_joint_positions(m: Model, d: Data, qvel_in: array2df):
+  def integrate_joints(m: Model, d: Data, qacc: array2df, qvel_in: array2df):
     worldId, jntid = wp.tid()
 
     jnt_type = m.jnt_type[jntid]
@@ -102,6 +86,16 @@ def _advance(
     qpos = d.qpos[worldId]
     qvel = qvel_in[worldId]
 
+    # advance the velocities of this joint's dofs before integrating its positions,
+    # so that semi-implicit integration reads back what this thread just wrote
+    dofnum = wp.where(jnt_type == wp.static(JointType.FREE.value), 6, 1)
+    dofnum = wp.where(jnt_type == wp.static(JointType.BALL.value), 3, dofnum)
+    for i in range(dofnum):
+      dofid = dof_adr + i
+      d.qvel[worldId, dofid] = (
+        d.qvel[worldId, dofid] + qacc[worldId, dofid] * m.opt.timestep
+      )
+
     if jnt_type == wp.static(JointType.FREE.value):
       qpos_pos = wp.vec3(qpos[qpos_adr], qpos[qpos_adr + 1], qpos[qpos_adr + 2])
       qvel_lin = wp.vec3(qvel[dof_adr], qvel[dof_adr + 1], qvel[dof_adr + 2])
@@ -147,9 +141,11 @@ def _advance(
 
   # skip if no stateful actuators.
   if m.na:
-    wp.launch(next_activation, dim=(d.nworld, m.nu), inputs=[m, d, act_dot])
-
-  wp.launch(advance_velocities, dim=(d.nworld, m.nv), inputs=[m, d, qacc])
+    wp.launch(
+      next_activation,
+      dim=(d.nworld, m.actuator_stateful_idx.shape[0]),
+      inputs=[m, d, act_dot],
+    )
 
   # advance positions with qvel if given, d.qvel otherwise (semi-implicit)
   if qvel is not None:
@@ -157,8 +153,9 @@ def _advance(
   else:
     qvel_in = d.qvel
 
-  wp.launch(integrate_joint_positions, dim=(d.nworld, m.njnt), inputs=[m, d, qvel_in])
+  wp.launch(integrate_joints, dim=(d.nworld, m.njnt), inputs=[m, d, qacc, qvel_in])
 
+  # time is a host scalar that no kernel reads, so advancing it costs no launch or sync
   d.time = d.time + m.opt.timestep
 
 
@@ -173,14 +170,24 @@ def euler(m: Model, d: Data):
     def add_damping_sum_qfrc_kernel_sparse(m: Model, d: Data):
       worldId, tid = wp.tid()
 
+      # copy row tid of qM, the diagonal first and then its ancestors, and add the
+      # damping to the diagonal in the same pass
       dof_Madr = m.dof_Madr[tid]
-      d.qM_integration[worldId, 0, dof_Madr] += m.opt.timestep * m.dof_damping[tid]
+      if tid == m.nv - 1:
+        row_end = m.nM
+      else:
+        row_end = m.dof_Madr[tid + 1]
+
+      d.qM_integration[worldId, 0, dof_Madr] = (
+        d.qM[worldId, 0, dof_Madr] + m.opt.timestep * m.dof_damping[tid]
+      )
+      for madr in range(dof_Madr + 1, row_end):
+        d.qM_integration[worldId, 0, madr] = d.qM[worldId, 0, madr]
 
       d.qfrc_integration[worldId, tid] = (
         d.qfrc_smooth[worldId, tid] + d.qfrc_constraint[worldId, tid]
       )
 
-    kernel_copy(d.qM_integration, d.qM)
     wp.launch(add_damping_sum_qfrc_kernel_sparse, dim=(d.nworld, m.nv), inputs=[m, d])
     smooth.factor_solve_i(
       m,
@@ -242,6 +249,25 @@ def euler(m: Model, d: Data):
     _advance(m, d, d.act_dot, d.qacc)
 
 
+def euler_graph(m: Model, d: Data) -> wp.Graph:
+  """Captures an Euler integration step as a CUDA graph.
+
+  Replaying the graph with wp.capture_launch advances d by one step with a single
+  launch. The graph is bound to the arrays of m and d and to the model options it
+  was captured with (e.g. disableflags, is_sparse): capture a new graph if these
+  change. Kernels are compiled on first use, so run euler at least once before
+  capturing. d.time is a host scalar and is not advanced by replays.
+  """
+
+  # capture runs the host code of euler, so restore the host-side time
+  time = d.time
+  with wp.ScopedCapture() as capture:
+    euler(m, d)
+  d.time = time
+
+  return capture.graph
+
+
 @event_scope
 def implicit(m: Model, d: Data):
   """Integrates fully implicit in velocity."""
@@ -127,6 +127,69 @@ class ForwardTest(absltest.TestCase):
     _assert_eq(d.qpos.numpy()[0], mjd.qpos, "qpos")
     _assert_eq(d.act.numpy()[0], mjd.act, "act")
 
+  def test_euler_activation(self):
+    mjm = mujoco.MjModel.from_xml_string("""
+      <mujoco>
+        <worldbody>
+          <body>
+            <joint name="hinge" type="hinge"/>
+            <geom type="sphere" size=".1"/>
+          </body>
+        </worldbody>
+        <actuator>
+          <motor joint="hinge"/>
+          <general joint="hinge" dyntype="filterexact" dynprm="0.1"/>
+          <general joint="hinge" dyntype="integrator" actlimited="true"
+            actrange="-1 1"/>
+          <general joint="hinge" dyntype="filter" dynprm="0.2" actlimited="true"
+            actrange="-0.5 0.5"/>
+        </actuator>
+      </mujoco>
+    """)
+    mjd = mujoco.MjData(mjm)
+    mjd.ctrl = np.array([1.0, 2.0, 50.0, -100.0])
+    mjd.act = np.array([0.5, 0.99, -0.45])
+    mujoco.mj_forward(mjm, mjd)
+
+    m = mjwarp.put_model(mjm)
+    d = mjwarp.put_data(mjm, mjd)
+
+    # activations follow a timestep changed after put_model
+    mjm.opt.timestep = m.opt.timestep = 2 * mjm.opt.timestep
+
+    mjwarp.euler(m, d)
+    mujoco.mj_Euler(mjm, mjd)
+
+    # the integrator and filter states are pushed past their limits
+    self.assertEqual(mjd.act[1], 1.0)
+    self.assertEqual(mjd.act[2], -0.5)
+    _assert_eq(d.act.numpy()[0], mjd.act, "act")
+
+  def test_euler_graph(self):
+    if not wp.get_device().is_cuda:
+      self.skipTest("graph capture requires a CUDA device")
+
+    path = epath.resource_path("mujoco_warp") / "test_data/pendula.xml"
+    mjm = mujoco.MjModel.from_xml_path(path.as_posix())
+    mjd = mujoco.MjData(mjm)
+    mjd.qvel[:] = 1.0
+    mjd.qacc[:] = 1.0
+    mujoco.mj_forward(mjm, mjd)
+
+    m = mjwarp.put_model(mjm)
+    d = mjwarp.put_data(mjm, mjd)
+    d_graph = mjwarp.put_data(mjm, mjd)
+
+    mjwarp.euler(m, d)
+    mjwarp.euler(m, d_graph)  # compile kernels before capture
+    graph = mjwarp.euler_graph(m, d_graph)
+    mjwarp.euler(m, d)
+    wp.capture_launch(graph)
+
+    _assert_eq(d_graph.qpos.numpy()[0], d.qpos.numpy()[0], "qpos")
+    _assert_eq(d_graph.qvel.numpy()[0], d.qvel.numpy()[0], "qvel")
+    _assert_eq(d_graph.act.numpy()[0], d.act.numpy()[0], "act")
+
   def test_disable_eulerdamp(self):
     path = epath.resource_path("mujoco_warp") / "test_data/pendula.xml"
     mjm = mujoco.MjModel.from_xml_path(path.as_posix())
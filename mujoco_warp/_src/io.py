@@ -98,18 +98,34 @@ def put_model(mjm: mujoco.MjModel) -> types.Model:
   tree_off = [0] + [len(bodies[i]) for i in range(len(bodies))]
   body_treeadr = np.cumsum(tree_off)[:-1]
 
+  # level and tile addresses drive the host-side launch loops on every step, so
+  # they are kept on the cpu: reading them with .numpy() is a view, not a sync
   m.body_tree = wp.array(body_tree, dtype=wp.int32, ndim=1)
   m.body_treeadr = wp.array(body_treeadr, dtype=wp.int32, ndim=1, device="cpu")
 
+  # children of each body, grouped by parent, so that subtree reductions can gather
+  # from the children of a body instead of scattering atomically into its parent
+  body_child = np.argsort(mjm.body_parentid[1:], kind="stable") + 1
+  body_childnum = np.bincount(mjm.body_parentid[1:], minlength=mjm.nbody)
+  body_childadr = np.cumsum(body_childnum) - body_childnum
+  m.body_childnum = wp.array(body_childnum, dtype=wp.int32, ndim=1)
+  m.body_childadr = wp.array(body_childadr, dtype=wp.int32, ndim=1)
+  m.body_child = wp.array(body_child, dtype=wp.int32, ndim=1)
+
   qLD_update_tree = np.empty(shape=(0, 3), dtype=int)
-  qLD_update_treeadr = np.empty(shape=(0,), dtype=int)
+  qLD_update_row = np.empty(shape=(0, 3), dtype=int)
+  qLD_update_rowadr = np.empty(shape=(0,), dtype=int)
+  dof_tree = np.empty(shape=(0,), dtype=int)
+  dof_treeadr = np.empty(shape=(0,), dtype=int)
   qLD_tile = np.empty(shape=(0,), dtype=int)
   qLD_tileadr = np.empty(shape=(0,), dtype=int)
   qLD_tilesize = np.empty(shape=(0,), dtype=int)
 
   if support.is_sparse(mjm):
-    # qLD_update_tree has dof tree ordering of qLD updates for sparse factor m
-    # qLD_update_treeadr contains starting index of each dof tree level
+    # qLD_update_tree has dof tree ordering of qLD updates for sparse factor m,
+    # with the updates of each destination row i contiguous
+    # qLD_update_row has (i, first update, number of updates) for each row i
+    # qLD_update_rowadr contains starting index of each dof tree level of rows
     qLD_updates, dof_depth = {}, np.zeros(mjm.nv, dtype=int) - 1
     for k in range(mjm.nv):
       dof_depth[k] = dof_depth[mjm.dof_parentid[k]] + 1
@@ -120,10 +136,24 @@ def put_model(mjm: mujoco.MjModel) -> types.Model:
         i = mjm.dof_parentid[i]
         Madr_ki += 1
 
-    # qLD_treeadr contains starting indicies of each level of sparse updates
-    qLD_update_tree = np.concatenate([qLD_updates[i] for i in range(len(qLD_updates))])
-    tree_off = [0] + [len(qLD_updates[i]) for i in range(len(qLD_updates))]
-    qLD_update_treeadr = np.cumsum(tree_off)[:-1]
+    # one thread per row i and level applies all updates to row i, without atomics
+    qLD_update_tree, qLD_update_row, row_off = [], [], [0]
+    for level in range(len(qLD_updates)):
+      rows = {}
+      for update in qLD_updates[level]:
+        rows.setdefault(update[0], []).append(update)
+      for i, updates in rows.items():
+        qLD_update_row.append((i, len(qLD_update_tree), len(updates)))
+        qLD_update_tree.extend(updates)
+      row_off.append(len(rows))
+    qLD_update_tree = np.array(qLD_update_tree)
+    qLD_update_row = np.array(qLD_update_row)
+    qLD_update_rowadr = np.cumsum(row_off)[:-1]
+
+    # dof_tree is BFS ordering of dof ids for sparse solves
+    # dof_treeadr contains starting index of each dof tree level
+    dof_tree = np.argsort(dof_depth, kind="stable")
+    dof_treeadr = np.searchsorted(dof_depth[dof_tree], np.arange(dof_depth.max() + 1))
   else:
     # qLD_tile has the dof id of each tile in qLD for dense factor m
     # qLD_tileadr contains starting index in qLD_tile of each tile group
@@ -187,9 +217,12 @@ def put_model(mjm: mujoco.MjModel) -> types.Model:
   m.qM_mulm_j = wp.array(qM_mulm_j, dtype=wp.int32, ndim=1)
   m.qM_madr_ij = wp.array(qM_madr_ij, dtype=wp.int32, ndim=1)
   m.qLD_update_tree = wp.array(qLD_update_tree, dtype=wp.vec3i, ndim=1)
-  m.qLD_update_treeadr = wp.array(
-    qLD_update_treeadr, dtype=wp.int32, ndim=1, device="cpu"
+  m.qLD_update_row = wp.array(qLD_update_row, dtype=wp.vec3i, ndim=1)
+  m.qLD_update_rowadr = wp.array(
+    qLD_update_rowadr, dtype=wp.int32, ndim=1, device="cpu"
   )
+  m.dof_tree = wp.array(dof_tree, dtype=wp.int32, ndim=1)
+  m.dof_treeadr = wp.array(dof_treeadr, dtype=wp.int32, ndim=1, device="cpu")
   m.qLD_tile = wp.array(qLD_tile, dtype=wp.int32, ndim=1)
   m.qLD_tileadr = wp.array(qLD_tileadr, dtype=wp.int32, ndim=1, device="cpu")
   m.qLD_tilesize = wp.array(qLD_tilesize, dtype=wp.int32, ndim=1, device="cpu")
@@ -224,8 +257,7 @@ def put_model(mjm: mujoco.MjModel) -> types.Model:
   m.body_mass = wp.array(mjm.body_mass, dtype=wp.float32, ndim=1)
 
   subtree_mass = np.copy(mjm.body_mass)
-  # TODO(team): should this be [mjm.nbody - 1, 0) ?
-  for i in range(mjm.nbody - 1, -1, -1):
+  for i in range(mjm.nbody - 1, 0, -1):
     subtree_mass[mjm.body_parentid[i]] += subtree_mass[i]
 
   m.subtree_mass = wp.array(subtree_mass, dtype=wp.float32, ndim=1)
@@ -308,6 +340,18 @@ def put_model(mjm: mujoco.MjModel) -> types.Model:
     or np.any(mjm.actuator_gaintype == types.GainType.AFFINE.value)
   )
 
+  # filter time constants, clamped away from zero for the exact filter update
+  actuator_filter_tau = np.maximum(mjm.actuator_dynprm[:, 0], types.MJ_MINVAL)
+  m.actuator_filter_tau = wp.array(actuator_filter_tau, dtype=wp.float32, ndim=1)
+
+  # joint types present in the model, for kernels specialized on joint type
+  m.jnt_typemask = sum(1 << int(t) for t in np.unique(mjm.jnt_type))
+
+  # stateful actuators, so activation kernels only launch over actuators with act
+  m.actuator_stateful_idx = wp.array(
+    np.nonzero(mjm.actuator_actadr != -1)[0], dtype=wp.int32, ndim=1
+  )
+
   return m
 
 
@@ -33,9 +33,9 @@ def mul_quat(u: wp.quat, v: wp.quat) -> wp.quat:
 @wp.func
 def rot_vec_quat(vec: wp.vec3, quat: wp.quat) -> wp.vec3:
   s, u = quat[0], wp.vec3(quat[1], quat[2], quat[3])
-  r = 2.0 * (wp.dot(u, vec) * u) + (s * s - wp.dot(u, u)) * vec
-  r = r + 2.0 * s * wp.cross(u, vec)
-  return r
+  # vec + 2 * u x (s * vec + u x vec), valid for unit quaternions (mju_rotVecQuat)
+  t = s * vec + wp.cross(u, vec)
+  return vec + 2.0 * wp.cross(u, t)
 
 
 @wp.func
@@ -48,19 +48,22 @@ def axis_angle_to_quat(axis: wp.vec3, angle: wp.float32) -> wp.quat:
 @wp.func
 def quat_to_mat(quat: wp.quat) -> wp.mat33:
   """Converts a quaternion into a 9-dimensional rotation matrix."""
-  vec = wp.vec4(quat[0], quat[1], quat[2], quat[3])
-  q = wp.outer(vec, vec)
+  # only the 10 unique products of the quaternion outer product are needed
+  w, x, y, z = quat[0], quat[1], quat[2], quat[3]
+  ww, xx, yy, zz = w * w, x * x, y * y, z * z
+  wx, wy, wz = w * x, w * y, w * z
+  xy, xz, yz = x * y, x * z, y * z
 
   return wp.mat33(
-    q[0, 0] + q[1, 1] - q[2, 2] - q[3, 3],
-    2.0 * (q[1, 2] - q[0, 3]),
-    2.0 * (q[1, 3] + q[0, 2]),
-    2.0 * (q[1, 2] + q[0, 3]),
-    q[0, 0] - q[1, 1] + q[2, 2] - q[3, 3],
-    2.0 * (q[2, 3] - q[0, 1]),
-    2.0 * (q[1, 3] - q[0, 2]),
-    2.0 * (q[2, 3] + q[0, 1]),
-    q[0, 0] - q[1, 1] - q[2, 2] + q[3, 3],
+    ww + xx - yy - zz,
+    2.0 * (xy - wz),
+    2.0 * (xz + wy),
+    2.0 * (xy + wz),
+    ww - xx + yy - zz,
+    2.0 * (yz - wx),
+    2.0 * (xz - wy),
+    2.0 * (yz + wx),
+    ww - xx - yy + zz,
   )
 
 
@@ -142,14 +145,17 @@ def quat_sub(qa: wp.quat, qb: wp.quat) -> wp.vec3:
 @wp.func
 def quat_integrate(q: wp.quat, v: wp.vec3, dt: wp.float32) -> wp.quat:
   """Integrates a quaternion given angular velocity and dt."""
-  norm_ = wp.length(v)
-  v = wp.normalize(v)  # does that need proper zero gradient handling?
-  angle = dt * norm_
-
-  q_res = axis_angle_to_quat(v, angle)
-  q_res = mul_quat(q, q_res)
-
-  return wp.normalize(q_res)
+  # fold 1 / |v| into the sine term instead of normalizing v, so the delta
+  # rotation needs a single sqrt that does not feed the normalization of q
+  norm = wp.sqrt(wp.dot(v, v))
+  half = 0.5 * dt * norm
+  s, c = wp.sin(half), wp.cos(half)
+  k = wp.where(norm > types.MJ_MINVAL, s / norm, 0.5 * dt)
+  q_delta = wp.quat(c, k * v[0], k * v[1], k * v[2])
+
+  # q_delta is unit by construction, so normalizing q up front keeps the
+  # result unit without a second normalize after the product
+  return mul_quat(wp.normalize(q), q_delta)
 
 
 @wp.func
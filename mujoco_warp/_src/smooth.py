@@ -33,29 +33,27 @@ from .warp_util import kernel_copy
 def kinematics(m: Model, d: Data):
   """Forward kinematics."""
 
-  @kernel
-  def _root(m: Model, d: Data):
-    worldid = wp.tid()
-    d.xpos[worldid, 0] = wp.vec3(0.0)
-    d.xquat[worldid, 0] = wp.quat(1.0, 0.0, 0.0, 0.0)
-    d.xipos[worldid, 0] = wp.vec3(0.0)
-    d.xmat[worldid, 0] = wp.identity(n=3, dtype=wp.float32)
-    d.ximat[worldid, 0] = wp.identity(n=3, dtype=wp.float32)
-
-  @kernel
-  def _level(m: Model, d: Data, leveladr: int):
-    worldid, nodeid = wp.tid()
-    bodyid = m.body_tree[leveladr + nodeid]
+  # joint types that are absent from the model are compiled out of _body
+  jnt_typemask = m.jnt_typemask
+  has_free = bool(jnt_typemask & (1 << JointType.FREE.value))
+  has_ball = bool(jnt_typemask & (1 << JointType.BALL.value))
+  has_slide = bool(jnt_typemask & (1 << JointType.SLIDE.value))
+  has_hinge = bool(jnt_typemask & (1 << JointType.HINGE.value))
+
+  @wp.func
+  def _body(m: Model, d: Data, worldid: int, bodyid: int):
     jntadr = m.body_jntadr[bodyid]
     jntnum = m.body_jntnum[bodyid]
     qpos = d.qpos[worldid]
 
-    if jntnum == 0:
-      # no joints - apply fixed translation and rotation relative to parent
-      pid = m.body_parentid[bodyid]
-      xpos = (d.xmat[worldid, pid] * m.body_pos[bodyid]) + d.xpos[worldid, pid]
-      xquat = math.mul_quat(d.xquat[worldid, pid], m.body_quat[bodyid])
-    elif jntnum == 1 and m.jnt_type[jntadr] == wp.static(JointType.FREE.value):
+    # warp evaluates both operands of `and`, so only read jnt_type once the body is
+    # known to have a joint: jointless bodies have jntadr == -1
+    is_free = False
+    if wp.static(has_free):
+      if jntnum == 1:
+        is_free = m.jnt_type[jntadr] == wp.static(JointType.FREE.value)
+
+    if is_free:
       # free joint
       qadr = m.jnt_qposadr[jntadr]
       xpos = wp.vec3(qpos[qadr], qpos[qadr + 1], qpos[qadr + 2])
@@ -64,10 +62,12 @@ def kinematics(m: Model, d: Data):
       d.xaxis[worldid, jntadr] = m.jnt_axis[jntadr]
     else:
       # regular or no joints
-      # apply fixed translation and rotation relative to parent
+      # apply fixed translation and rotation relative to parent, rotating by the
+      # parent quaternion instead of loading its xmat
       pid = m.body_parentid[bodyid]
-      xpos = (d.xmat[worldid, pid] * m.body_pos[bodyid]) + d.xpos[worldid, pid]
-      xquat = math.mul_quat(d.xquat[worldid, pid], m.body_quat[bodyid])
+      xquat_parent = d.xquat[worldid, pid]
+      xpos = math.rot_vec_quat(m.body_pos[bodyid], xquat_parent) + d.xpos[worldid, pid]
+      xquat = math.mul_quat(xquat_parent, m.body_quat[bodyid])
 
       for _ in range(jntnum):
         qadr = m.jnt_qposadr[jntadr]
@@ -76,24 +76,27 @@ def kinematics(m: Model, d: Data):
         xanchor = math.rot_vec_quat(m.jnt_pos[jntadr], xquat) + xpos
         xaxis = math.rot_vec_quat(jnt_axis, xquat)
 
-        if jnt_type == wp.static(JointType.BALL.value):
-          qloc = wp.quat(
-            qpos[qadr + 0],
-            qpos[qadr + 1],
-            qpos[qadr + 2],
-            qpos[qadr + 3],
-          )
-          xquat = math.mul_quat(xquat, qloc)
-          # correct for off-center rotation
-          xpos = xanchor - math.rot_vec_quat(m.jnt_pos[jntadr], xquat)
-        elif jnt_type == wp.static(JointType.SLIDE.value):
-          xpos += xaxis * (qpos[qadr] - m.qpos0[qadr])
-        elif jnt_type == wp.static(JointType.HINGE.value):
-          qpos0 = m.qpos0[qadr]
-          qloc = math.axis_angle_to_quat(jnt_axis, qpos[qadr] - qpos0)
-          xquat = math.mul_quat(xquat, qloc)
-          # correct for off-center rotation
-          xpos = xanchor - math.rot_vec_quat(m.jnt_pos[jntadr], xquat)
+        if wp.static(has_ball):
+          if jnt_type == wp.static(JointType.BALL.value):
+            qloc = wp.quat(
+              qpos[qadr + 0],
+              qpos[qadr + 1],
+              qpos[qadr + 2],
+              qpos[qadr + 3],
+            )
+            xquat = math.mul_quat(xquat, qloc)
+            # correct for off-center rotation
+            xpos = xanchor - math.rot_vec_quat(m.jnt_pos[jntadr], xquat)
+        if wp.static(has_slide):
+          if jnt_type == wp.static(JointType.SLIDE.value):
+            xpos += xaxis * (qpos[qadr] - m.qpos0[qadr])
+        if wp.static(has_hinge):
+          if jnt_type == wp.static(JointType.HINGE.value):
+            qpos0 = m.qpos0[qadr]
+            qloc = math.axis_angle_to_quat(jnt_axis, qpos[qadr] - qpos0)
+            xquat = math.mul_quat(xquat, qloc)
+            # correct for off-center rotation
+            xpos = xanchor - math.rot_vec_quat(m.jnt_pos[jntadr], xquat)
 
         d.xanchor[worldid, jntadr] = xanchor
         d.xaxis[worldid, jntadr] = xaxis
@@ -108,6 +111,20 @@ def kinematics(m: Model, d: Data):
       math.mul_quat(xquat, m.body_iquat[bodyid])
     )
 
+  @kernel
+  def _root(m: Model, d: Data):
+    worldid = wp.tid()
+    d.xpos[worldid, 0] = wp.vec3(0.0)
+    d.xquat[worldid, 0] = wp.quat(1.0, 0.0, 0.0, 0.0)
+    d.xipos[worldid, 0] = wp.vec3(0.0)
+    d.xmat[worldid, 0] = wp.identity(n=3, dtype=wp.float32)
+    d.ximat[worldid, 0] = wp.identity(n=3, dtype=wp.float32)
+
+  @kernel
+  def _level(m: Model, d: Data, leveladr: int):
+    worldid, nodeid = wp.tid()
+    _body(m, d, worldid, m.body_tree[leveladr + nodeid])
+
   @kernel
   def geom_local_to_global(m: Model, d: Data):
     worldid, geomid = wp.tid()
@@ -149,17 +166,15 @@ def kinematics(m: Model, d: Data):
 def com_pos(m: Model, d: Data):
   """Map inertias and motion dofs to global frame centered at subtree-CoM."""
 
-  @kernel
-  def subtree_com_init(m: Model, d: Data):
-    worldid, bodyid = wp.tid()
-    d.subtree_com[worldid, bodyid] = d.xipos[worldid, bodyid] * m.body_mass[bodyid]
-
   @kernel
   def subtree_com_acc(m: Model, d: Data, leveladr: int):
     worldid, nodeid = wp.tid()
     bodyid = m.body_tree[leveladr + nodeid]
-    pid = m.body_parentid[bodyid]
-    wp.atomic_add(d.subtree_com, worldid, pid, d.subtree_com[worldid, bodyid])
+    subtree_com = d.xipos[worldid, bodyid] * m.body_mass[bodyid]
+    childadr = m.body_childadr[bodyid]
+    for i in range(m.body_childnum[bodyid]):
+      subtree_com += d.subtree_com[worldid, m.body_child[childadr + i]]
+    d.subtree_com[worldid, bodyid] = subtree_com
 
   @kernel
   def subtree_div(m: Model, d: Data):
@@ -176,14 +191,17 @@ def com_pos(m: Model, d: Data):
     # express inertia in com-based frame (mju_inertCom)
 
     res = vec10()
-    # res_rot = mat * diag(inert) * mat'
-    tmp = mat @ wp.diag(inert) @ wp.transpose(mat)
-    res[0] = tmp[0, 0]
-    res[1] = tmp[1, 1]
-    res[2] = tmp[2, 2]
-    res[3] = tmp[0, 1]
-    res[4] = tmp[0, 2]
-    res[5] = tmp[1, 2]
+    # res_rot = mat * diag(inert) * mat', which is symmetric: only compute the 6
+    # unique entries as dot products of the scaled rows of mat
+    row0, row1, row2 = mat[0], mat[1], mat[2]
+    row0_inert = wp.cw_mul(row0, inert)
+    row1_inert = wp.cw_mul(row1, inert)
+    res[0] = wp.dot(row0_inert, row0)
+    res[1] = wp.dot(row1_inert, row1)
+    res[2] = wp.dot(wp.cw_mul(row2, inert), row2)
+    res[3] = wp.dot(row0_inert, row1)
+    res[4] = wp.dot(row0_inert, row2)
+    res[5] = wp.dot(row1_inert, row2)
     # res_rot -= mass * dif_cross * dif_cross
     res[0] += mass * (dif[1] * dif[1] + dif[2] * dif[2])
     res[1] += mass * (dif[0] * dif[0] + dif[2] * dif[2])
@@ -207,7 +225,6 @@ def com_pos(m: Model, d: Data):
     dofid = m.jnt_dofadr[jntid]
     jnt_type = m.jnt_type[jntid]
     xaxis = d.xaxis[worldid, jntid]
-    xmat = wp.transpose(d.xmat[worldid, bodyid])
 
     # compute com-anchor vector
     offset = d.subtree_com[worldid, m.body_rootid[bodyid]] - d.xanchor[worldid, jntid]
@@ -218,11 +235,13 @@ def com_pos(m: Model, d: Data):
       res[dofid + 1] = wp.spatial_vector(0.0, 0.0, 0.0, 0.0, 1.0, 0.0)
       res[dofid + 2] = wp.spatial_vector(0.0, 0.0, 0.0, 0.0, 0.0, 1.0)
       # I_3 rotation in child frame (assume no subsequent rotations)
+      xmat = wp.transpose(math.quat_to_mat(d.xquat[worldid, bodyid]))
       res[dofid + 3] = wp.spatial_vector(xmat[0], wp.cross(xmat[0], offset))
       res[dofid + 4] = wp.spatial_vector(xmat[1], wp.cross(xmat[1], offset))
       res[dofid + 5] = wp.spatial_vector(xmat[2], wp.cross(xmat[2], offset))
     elif jnt_type == wp.static(JointType.BALL.value):  # ball
       # I_3 rotation in child frame (assume no subsequent rotations)
+      xmat = wp.transpose(math.quat_to_mat(d.xquat[worldid, bodyid]))
       res[dofid + 0] = wp.spatial_vector(xmat[0], wp.cross(xmat[0], offset))
       res[dofid + 1] = wp.spatial_vector(xmat[1], wp.cross(xmat[1], offset))
       res[dofid + 2] = wp.spatial_vector(xmat[2], wp.cross(xmat[2], offset))
@@ -231,8 +250,6 @@ def com_pos(m: Model, d: Data):
     elif jnt_type == wp.static(JointType.HINGE.value):  # hinge
       res[dofid] = wp.spatial_vector(xaxis, wp.cross(xaxis, offset))
 
-  wp.launch(subtree_com_init, dim=(d.nworld, m.nbody), inputs=[m, d])
-
   body_treeadr = m.body_treeadr.numpy()
 
   for i in reversed(range(len(body_treeadr))):
@@ -249,16 +266,17 @@ def com_pos(m: Model, d: Data):
 def crb(m: Model, d: Data):
   """Composite rigid body inertia algorithm."""
 
-  kernel_copy(d.crb, d.cinert)
-
   @kernel
   def crb_accumulate(m: Model, d: Data, leveladr: int):
     worldid, nodeid = wp.tid()
     bodyid = m.body_tree[leveladr + nodeid]
-    pid = m.body_parentid[bodyid]
-    if pid == 0:
-      return
-    wp.atomic_add(d.crb, worldid, pid, d.crb[worldid, bodyid])
+    crb = d.cinert[worldid, bodyid]
+    # the world body does not accumulate its children
+    if bodyid != 0:
+      childadr = m.body_childadr[bodyid]
+      for i in range(m.body_childnum[bodyid]):
+        crb += d.crb[worldid, m.body_child[childadr + i]]
+    d.crb[worldid, bodyid] = crb
 
   @kernel
   def qM_sparse(m: Model, d: Data):
@@ -320,16 +338,24 @@ def _factor_i_sparse(m: Model, d: Data, M: array3df, L: array3df, D: array2df):
   @kernel
   def qLD_acc(m: Model, leveladr: int, L: array3df):
     worldid, nodeid = wp.tid()
-    update = m.qLD_update_tree[leveladr + nodeid]
-    i, k, Madr_ki = update[0], update[1], update[2]
+    row = m.qLD_update_row[leveladr + nodeid]
+    i, updateadr, updatenum = row[0], row[1], row[2]
     Madr_i = m.dof_Madr[i]
-    # tmp = M(k,i) / M(k,k)
-    tmp = L[worldid, 0, Madr_ki] / L[worldid, 0, m.dof_Madr[k]]
-    for j in range(m.dof_Madr[i + 1] - Madr_i):
-      # M(i,j) -= M(k,j) * tmp
-      wp.atomic_sub(L[worldid, 0], Madr_i + j, L[worldid, 0, Madr_ki + j] * tmp)
-    # M(k,i) = tmp
-    L[worldid, 0, Madr_ki] = tmp
+    rownnz = m.dof_Madr[i + 1] - Madr_i
+    # this thread owns row i and applies the updates from all descendants k
+    for u in range(updatenum):
+      update = m.qLD_update_tree[updateadr + u]
+      k, Madr_ki = update[1], update[2]
+      # tmp = M(k,i) / M(k,k)
+      tmp = L[worldid, 0, Madr_ki] / L[worldid, 0, m.dof_Madr[k]]
+      for j in range(rownnz):
+        # M(i,j) -= M(k,j) * tmp
+        Madr_ij = Madr_i + j
+        L[worldid, 0, Madr_ij] = (
+          L[worldid, 0, Madr_ij] - L[worldid, 0, Madr_ki + j] * tmp
+        )
+      # M(k,i) = tmp
+      L[worldid, 0, Madr_ki] = tmp
 
   @kernel
   def qLDiag_div(m: Model, L: array3df, D: array2df):
@@ -338,13 +364,14 @@ def _factor_i_sparse(m: Model, d: Data, M: array3df, L: array3df, D: array2df):
 
   kernel_copy(L, M)
 
-  qLD_update_treeadr = m.qLD_update_treeadr.numpy()
+  qLD_update_rowadr = m.qLD_update_rowadr.numpy()
 
-  for i in reversed(range(len(qLD_update_treeadr))):
-    if i == len(qLD_update_treeadr) - 1:
-      beg, end = qLD_update_treeadr[i], m.qLD_update_tree.shape[0]
+  for i in reversed(range(len(qLD_update_rowadr))):
+    beg = qLD_update_rowadr[i]
+    if i == len(qLD_update_rowadr) - 1:
+      end = m.qLD_update_row.shape[0]
     else:
-      beg, end = qLD_update_treeadr[i], qLD_update_treeadr[i + 1]
+      end = qLD_update_rowadr[i + 1]
     wp.launch(qLD_acc, dim=(d.nworld, end - beg), inputs=[m, beg, L])
 
   wp.launch(qLDiag_div, dim=(d.nworld, m.nv), inputs=[m, L, D])
@@ -399,10 +426,15 @@ def factor_m(m: Model, d: Data):
 def rne(m: Model, d: Data):
   """Computes inverse dynamics using Newton-Euler algorithm."""
 
+  gravity_disabled = bool(m.opt.disableflags & DisableBit.GRAVITY)
+
   @kernel
-  def cacc_gravity(m: Model, d: Data):
+  def cacc_world(m: Model, d: Data):
     worldid = wp.tid()
-    d.rne_cacc[worldid, 0] = wp.spatial_vector(wp.vec3(0.0), -m.opt.gravity)
+    if wp.static(gravity_disabled):
+      d.rne_cacc[worldid, 0] = wp.spatial_vector(wp.vec3(0.0), wp.vec3(0.0))
+    else:
+      d.rne_cacc[worldid, 0] = wp.spatial_vector(wp.vec3(0.0), -m.opt.gravity)
 
   @kernel
   def cacc_level(
@@ -420,22 +452,18 @@ def rne(m: Model, d: Data):
       local_cacc += d.cdof_dot[worldid, dofadr + i] * d.qvel[worldid, dofadr + i]
     d.rne_cacc[worldid, bodyid] = local_cacc
 
-  @kernel
-  def frc_fn(d: Data):
-    worldid, bodyid = wp.tid()
-    frc = math.inert_vec(d.cinert[worldid, bodyid], d.rne_cacc[worldid, bodyid])
-    frc += math.motion_cross_force(
-      d.cvel[worldid, bodyid],
-      math.inert_vec(d.cinert[worldid, bodyid], d.cvel[worldid, bodyid]),
-    )
-    d.rne_cfrc[worldid, bodyid] = frc
-
   @kernel
   def cfrc_fn(m: Model, d: Data, leveladr: int):
     worldid, nodeid = wp.tid()
     bodyid = m.body_tree[leveladr + nodeid]
-    pid = m.body_parentid[bodyid]
-    wp.atomic_add(d.rne_cfrc[worldid], pid, d.rne_cfrc[worldid, bodyid])
+    cinert = d.cinert[worldid, bodyid]
+    cvel = d.cvel[worldid, bodyid]
+    frc = math.inert_vec(cinert, d.rne_cacc[worldid, bodyid])
+    frc += math.motion_cross_force(cvel, math.inert_vec(cinert, cvel))
+    childadr = m.body_childadr[bodyid]
+    for i in range(m.body_childnum[bodyid]):
+      frc += d.rne_cfrc[worldid, m.body_child[childadr + i]]
+    d.rne_cfrc[worldid, bodyid] = frc
 
   @kernel
   def qfrc_bias(m: Model, d: Data):
@@ -445,10 +473,8 @@ def rne(m: Model, d: Data):
       d.cdof[worldid, dofid], d.rne_cfrc[worldid, bodyid]
     )
 
-  if m.opt.disableflags & DisableBit.GRAVITY:
-    d.rne_cacc.zero_()
-  else:
-    wp.launch(cacc_gravity, dim=[d.nworld], inputs=[m, d])
+  # only the world acceleration is seeded, cacc_level overwrites every other body
+  wp.launch(cacc_world, dim=[d.nworld], inputs=[m, d])
 
   body_treeadr = m.body_treeadr.numpy()
   for i in range(len(body_treeadr)):
@@ -456,8 +482,6 @@ def rne(m: Model, d: Data):
     end = m.nbody if i == len(body_treeadr) - 1 else body_treeadr[i + 1]
     wp.launch(cacc_level, dim=(d.nworld, end - beg), inputs=[m, d, beg])
 
-  wp.launch(frc_fn, dim=[d.nworld, m.nbody], inputs=[d])
-
   for i in reversed(range(len(body_treeadr))):
     beg = body_treeadr[i]
     end = m.nbody if i == len(body_treeadr) - 1 else body_treeadr[i + 1]
@@ -614,41 +638,48 @@ def _solve_LD_sparse(
   @kernel
   def x_acc_up(m: Model, L: array3df, x: array2df, leveladr: int):
     worldid, nodeid = wp.tid()
-    update = m.qLD_update_tree[leveladr + nodeid]
-    i, k, Madr_ki = update[0], update[1], update[2]
-    wp.atomic_sub(x[worldid], i, L[worldid, 0, Madr_ki] * x[worldid, k])
-
-  @kernel
-  def qLDiag_mul(D: array2df, x: array2df):
-    worldid, dofid = wp.tid()
-    x[worldid, dofid] *= D[worldid, dofid]
+    row = m.qLD_update_row[leveladr + nodeid]
+    i, updateadr, updatenum = row[0], row[1], row[2]
+    # x(i) -= sum_k L(k,i) * x(k) over the descendants k of i
+    xi = x[worldid, i]
+    for u in range(updatenum):
+      update = m.qLD_update_tree[updateadr + u]
+      xi -= L[worldid, 0, update[2]] * x[worldid, update[1]]
+    x[worldid, i] = xi
 
   @kernel
-  def x_acc_down(m: Model, L: array3df, x: array2df, leveladr: int):
+  def x_acc_down(m: Model, L: array3df, D: array2df, x: array2df, leveladr: int):
     worldid, nodeid = wp.tid()
-    update = m.qLD_update_tree[leveladr + nodeid]
-    i, k, Madr_ki = update[0], update[1], update[2]
-    wp.atomic_sub(x[worldid], k, L[worldid, 0, Madr_ki] * x[worldid, i])
+    k = m.dof_tree[leveladr + nodeid]
+    # x(k) = x(k) * D(k) - sum_i L(k,i) * x(i) over the ancestors i of k, which
+    # belong to shallower levels and are already final
+    xk = x[worldid, k] * D[worldid, k]
+    Madr_ki = m.dof_Madr[k] + 1
+    i = m.dof_parentid[k]
+    while i >= 0:
+      xk -= L[worldid, 0, Madr_ki] * x[worldid, i]
+      Madr_ki += 1
+      i = m.dof_parentid[i]
+    x[worldid, k] = xk
 
   kernel_copy(x, y)
 
-  qLD_update_treeadr = m.qLD_update_treeadr.numpy()
+  qLD_update_rowadr = m.qLD_update_rowadr.numpy()
 
-  for i in reversed(range(len(qLD_update_treeadr))):
-    if i == len(qLD_update_treeadr) - 1:
-      beg, end = qLD_update_treeadr[i], m.qLD_update_tree.shape[0]
+  for i in reversed(range(len(qLD_update_rowadr))):
+    beg = qLD_update_rowadr[i]
+    if i == len(qLD_update_rowadr) - 1:
+      end = m.qLD_update_row.shape[0]
     else:
-      beg, end = qLD_update_treeadr[i], qLD_update_treeadr[i + 1]
+      end = qLD_update_rowadr[i + 1]
     wp.launch(x_acc_up, dim=(d.nworld, end - beg), inputs=[m, L, x, beg])
 
-  wp.launch(qLDiag_mul, dim=(d.nworld, m.nv), inputs=[D, x])
+  dof_treeadr = m.dof_treeadr.numpy()
 
-  for i in range(len(qLD_update_treeadr)):
-    if i == len(qLD_update_treeadr) - 1:
-      beg, end = qLD_update_treeadr[i], m.qLD_update_tree.shape[0]
-    else:
-      beg, end = qLD_update_treeadr[i], qLD_update_treeadr[i + 1]
-    wp.launch(x_acc_down, dim=(d.nworld, end - beg), inputs=[m, L, x, beg])
+  for i in range(len(dof_treeadr)):
+    beg = dof_treeadr[i]
+    end = m.nv if i == len(dof_treeadr) - 1 else dof_treeadr[i + 1]
+    wp.launch(x_acc_down, dim=(d.nworld, end - beg), inputs=[m, L, D, x, beg])
 
 
 def _solve_LD_dense(m: Model, d: Data, L: array3df, x: array2df, y: array2df):
@@ -128,14 +128,23 @@ class SmoothTest(parameterized.TestCase):
 
   def test_rne(self):
     """Tests rne."""
-    _, mjd, m, d = test_util.fixture("pendula.xml")
+    mjm, mjd, m, d = test_util.fixture("pendula.xml")
 
     d.qfrc_bias.zero_()
 
     mjwarp.rne(m, d)
     _assert_eq(d.qfrc_bias.numpy()[0], mjd.qfrc_bias, "qfrc_bias")
 
-    # TODO(team): test DisableBit.GRAVITY
+    # disable gravity: the world acceleration left over from the call above must be
+    # overwritten with zero
+    mjm.opt.disableflags |= mujoco.mjtDisableBit.mjDSBL_GRAVITY
+    mujoco.mj_forward(mjm, mjd)
+    m = mjwarp.put_model(mjm)
+
+    d.qfrc_bias.zero_()
+
+    mjwarp.rne(m, d)
+    _assert_eq(d.qfrc_bias.numpy()[0], mjd.qfrc_bias, "qfrc_bias (gravity disabled)")
 
   def test_com_vel(self):
     """Tests com_vel."""
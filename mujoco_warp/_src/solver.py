@@ -106,7 +106,7 @@ def _update_constraint(m: types.Model, d: types.Data):
 
   @kernel
   def _qfrc_constraint(d: types.Data):
-    dofid, efcid = wp.tid()
+    efcid, dofid = wp.tid()
 
     if efcid >= d.nefc[0]:
       return
@@ -136,7 +136,7 @@ def _update_constraint(m: types.Model, d: types.Data):
   # qfrc_constraint = efc_J.T @ efc_force
   d.qfrc_constraint.zero_()
 
-  wp.launch(_qfrc_constraint, dim=(m.nv, d.njmax), inputs=[d])
+  wp.launch(_qfrc_constraint, dim=(d.njmax, m.nv), inputs=[d])
 
   # gauss = 0.5 * (Ma - qfrc_smooth).T @ (qacc - qacc_smooth)
 
@@ -344,22 +344,28 @@ class Model:
     qpos0: qpos values at default pose                       (nq,)
     qpos_spring: reference pose for springs                  (nq,)
     body_tree: BFS ordering of body ids
-    body_treeadr: starting index of each body tree level
+    body_treeadr: starting index of each body tree level (host)
+    body_childnum: number of children of each body
+    body_childadr: starting index of each body's children in body_child
+    body_child: child body ids, contiguous per parent
     actuator_moment_offset_nv: tiling configuration
     actuator_moment_offset_nu: tiling configuration
-    actuator_moment_tileadr: tiling configuration
-    actuator_moment_tilesize_nv: tiling configuration
-    actuator_moment_tilesize_nu: tiling configuration
+    actuator_moment_tileadr: tiling configuration (host)
+    actuator_moment_tilesize_nv: tiling configuration (host)
+    actuator_moment_tilesize_nu: tiling configuration (host)
     qM_fullm_i: sparse mass matrix addressing
     qM_fullm_j: sparse mass matrix addressing
     qM_mulm_i: sparse mass matrix addressing
     qM_mulm_j: sparse mass matrix addressing
     qM_madr_ij: sparse mass matrix addressing
-    qLD_update_tree: dof tree ordering for qLD updates
-    qLD_update_treeadr: index of each dof tree level
+    qLD_update_tree: dof tree ordering for qLD updates, grouped by row
+    qLD_update_row: row, first update and number of updates
+    qLD_update_rowadr: index of each dof tree level of rows (host)
+    dof_tree: BFS ordering of dof ids
+    dof_treeadr: starting index of each dof tree level (host)
     qLD_tile: tiling configuration
-    qLD_tileadr: tiling configuration
-    qLD_tilesize: tiling configuration
+    qLD_tileadr: tiling configuration (host)
+    qLD_tilesize: tiling configuration (host)
     body_parentid: id of body's parent                       (nbody,)
     body_rootid: id of root above body                       (nbody,)
     body_weldid: id of body that this body is welded to      (nbody,)
@@ -446,6 +452,9 @@ class Model:
     actuator_gear: scale length and transmitted force        (nu, 6)
     exclude_signature: body1 << 16 + body2                   (nexclude,)
     actuator_affine_bias_gain: affine bias/gain present
+    actuator_stateful_idx: ids of actuators with activation  (<=nu,)
+    actuator_filter_tau: filter time constant, at least mjMINVAL (nu,)
+    jnt_typemask: bitmask of joint types in the model, 1 << mjtJoint
   """
 
   nq: int
@@ -465,6 +474,9 @@ class Model:
   qpos_spring: wp.array(dtype=wp.float32, ndim=1)
   body_tree: wp.array(dtype=wp.int32, ndim=1)  # warp only
   body_treeadr: wp.array(dtype=wp.int32, ndim=1)  # warp only
+  body_childnum: wp.array(dtype=wp.int32, ndim=1)  # warp only
+  body_childadr: wp.array(dtype=wp.int32, ndim=1)  # warp only
+  body_child: wp.array(dtype=wp.int32, ndim=1)  # warp only
   actuator_moment_offset_nv: wp.array(dtype=wp.int32, ndim=1)  # warp only
   actuator_moment_offset_nu: wp.array(dtype=wp.int32, ndim=1)  # warp only
   actuator_moment_tileadr: wp.array(dtype=wp.int32, ndim=1)  # warp only
@@ -476,7 +488,10 @@ class Model:
   qM_mulm_j: wp.array(dtype=wp.int32, ndim=1)  # warp only
   qM_madr_ij: wp.array(dtype=wp.int32, ndim=1)  # warp only
   qLD_update_tree: wp.array(dtype=wp.vec3i, ndim=1)  # warp only
-  qLD_update_treeadr: wp.array(dtype=wp.int32, ndim=1)  # warp only
+  qLD_update_row: wp.array(dtype=wp.vec3i, ndim=1)  # warp only
+  qLD_update_rowadr: wp.array(dtype=wp.int32, ndim=1)  # warp only
+  dof_tree: wp.array(dtype=wp.int32, ndim=1)  # warp only
+  dof_treeadr: wp.array(dtype=wp.int32, ndim=1)  # warp only
   qLD_tile: wp.array(dtype=wp.int32, ndim=1)  # warp only
   qLD_tileadr: wp.array(dtype=wp.int32, ndim=1)  # warp only
   qLD_tilesize: wp.array(dtype=wp.int32, ndim=1)  # warp only
@@ -566,6 +581,9 @@ class Model:
   actuator_gear: wp.array(dtype=wp.spatial_vector, ndim=1)
   exclude_signature: wp.array(dtype=wp.int32, ndim=1)
   actuator_affine_bias_gain: bool  # warp only
+  actuator_stateful_idx: wp.array(dtype=wp.int32, ndim=1)  # warp only
+  actuator_filter_tau: wp.array(dtype=wp.float32, ndim=1)  # warp only
+  jnt_typemask: int  # warp only
 
 
 @wp.struct
@@ -609,7 +627,7 @@ class Data:
     ncon: number of detected contacts                           ()
     nl: number of limit constraints                             ()
     nefc: number of constraints                                 (nworld,)
-    time: simulation time                                       ()
+    time: simulation time (host)                                ()
     qpos: position                                              (nworld, nq)
     qvel: velocity                                              (nworld, nv)
     act: actuator activation                                    (nworld, na)